@@ -0,0 +1,320 @@
+# history_store.py
+"""
+アップロードごとの整理済みデータを蓄積する、ローカルのファイル型分析ストア（SQLite）。
+
+各ページで整理したデータを任意で保存しておくと、複数回のアップロードをまたいだ
+集計（例：3年連続で伸びた大分類、担当者別・四半期別の採用率）を
+pandasに全件読み込まずにSQLで実行できます。
+
+コマンドラインからも利用できます：
+    python history_store.py "SELECT * FROM wholesale_sales LIMIT 10"
+"""
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# 保存先（既定はこのファイルと同じフォルダ。環境変数 EIGYOU_HISTORY_DB で変更可能）
+DB_PATH = os.environ.get(
+    "EIGYOU_HISTORY_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.db")
+)
+
+# テーブル定義
+# columns: 列名と型、key: 再アップロード時に置き換える単位（同じキーの既存行は削除してから追加）
+TABLES = {
+    # 卸営業数値分析：clean_sheet の出力（年度ごと）
+    "wholesale_sales": {
+        "columns": {
+            "年度": "INTEGER",
+            "得意先コード": "TEXT",
+            "得意先名": "TEXT",
+            "大分類": "TEXT",
+            "純売上額": "REAL",
+            "構成比": "REAL",
+        },
+        "key": ["年度"],
+    },
+    # アイテム別集計：分類・年月ごとの個数と金額
+    "item_sales": {
+        "columns": {
+            "分類": "TEXT",
+            "年": "INTEGER",
+            "月": "INTEGER",
+            "個数": "REAL",
+            "金額": "REAL",
+        },
+        "key": ["年", "月"],
+    },
+    # 営業報告分析：訪問データ（商品単位）
+    "visits": {
+        "columns": {
+            "UUID": "TEXT",
+            "シート名": "TEXT",
+            "担当者": "TEXT",
+            "種別": "TEXT",
+            "記入日": "TEXT",
+            "地域": "TEXT",
+            "大分類": "TEXT",
+            "ステータス": "TEXT",
+            "商品名": "TEXT",
+            "結果": "TEXT",
+            "カテゴリ": "TEXT",
+        },
+        "key": ["UUID"],
+    },
+    # 営業報告分析：操作履歴
+    "operation_logs": {
+        "columns": {
+            "日時": "TEXT",
+            "シート名": "TEXT",
+            "操作タイプ": "TEXT",
+            "対象UUID": "TEXT",
+            "ステータスの変更": "TEXT",
+            "商品ステータス": "TEXT",
+        },
+        "key": ["日時", "対象UUID", "操作タイプ"],
+    },
+}
+
+# 連続成長の集計対象（テーブル名 → (集計単位の列, 年の列, 月の列, 値の列)）
+# 月の列がある場合は、直近年に存在する月だけで各年を比較する（一部の月しかない年と通年を比べないため）
+# 月の列がない wholesale_sales は、通年のデータが保存されている前提で比較する
+GROWTH_SOURCES = {
+    "wholesale_sales": ("大分類", "年度", None, "純売上額"),
+    "item_sales": ("分類", "年", "月", "金額"),
+}
+
+# ---------------------------- ヘルパー関数 ----------------------------
+
+def _quote(name):
+    """
+    SQLの識別子（日本語の列名など）をダブルクォートで囲みます。
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+def connect(path=None, read_only=False):
+    """
+    ストアに接続し、テーブルとインデックスがなければ作成します。
+    read_only=True の場合は読み取り専用で接続します（自由入力のSQL用）。
+    """
+    path = path or DB_PATH
+    if read_only:
+        # パスに # ? % などが含まれても正しく開けるよう、URIはエスケープして組み立てる
+        return sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+
+    conn = sqlite3.connect(path)
+    with conn:
+        for table, spec in TABLES.items():
+            cols = ", ".join(f"{_quote(c)} {t}" for c, t in spec["columns"].items())
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({cols}, 取込日時 TEXT)")
+            # 後から追加した列を既存のテーブルにも追加
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for c, t in spec["columns"].items():
+                if c not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {_quote(c)} {t}")
+            key_cols = ", ".join(_quote(c) for c in spec["key"])
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_key ON {table} ({key_cols})")
+    return conn
+
+def _to_records(table, df):
+    """
+    DataFrameをテーブル定義の列順に整形し、SQLiteに書き込める値のリストに変換します。
+    """
+    spec = TABLES[table]["columns"]
+    out = pd.DataFrame(index=df.index)
+    for col, col_type in spec.items():
+        if col not in df.columns:
+            out[col] = None # 存在しない列はNULLとして保存
+            continue
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            # 日時は文字列で保存（SQLiteの日付関数でそのまま扱える形式）
+            s = s.dt.strftime("%Y-%m-%d %H:%M:%S")
+        elif col_type in ("INTEGER", "REAL"):
+            s = pd.to_numeric(s, errors="coerce")
+            if col_type == "INTEGER":
+                s = s.round().astype("Int64")
+        else:
+            # リスト（カテゴリ）は「・」区切りの文字列に変換
+            s = s.apply(lambda x: "・".join(map(str, x)) if isinstance(x, list) else x)
+            s = s.where(s.isna(), s.astype(str))
+        out[col] = s
+
+    out["取込日時"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    out = out.astype(object).where(out.notna(), None)
+    return list(out.itertuples(index=False, name=None))
+
+def save_frame(table, df, path=None):
+    """
+    DataFrameをストアに追加します。
+    テーブル定義のキーが同じ既存行は先に削除するため、同じデータを再アップロードしても重複しません。
+    キーが空欄の行は置き換えの対象にできないため保存しません。
+    (保存した行数, キーが空欄で保存しなかった行数) を返します。
+    """
+    if table not in TABLES:
+        raise ValueError(f"未定義のテーブルです: {table}")
+    if df.empty:
+        return 0, 0
+
+    records = _to_records(table, df)
+    cols = list(TABLES[table]["columns"]) + ["取込日時"]
+    key = TABLES[table]["key"]
+    key_idx = [cols.index(k) for k in key]
+
+    # キーが空欄の行を除外（SQLでは NULL = NULL が一致しないため、残すと保存のたびに重複する）
+    valid = [r for r in records if all(r[i] is not None for i in key_idx)]
+    skipped = len(records) - len(valid)
+    records = valid
+    if not records:
+        return 0, skipped
+    keys = {tuple(r[i] for i in key_idx) for r in records}
+
+    conn = connect(path)
+    try:
+        with conn: # 削除と追加を1つのトランザクションで実行
+            where = " AND ".join(f"{_quote(k)} = ?" for k in key)
+            conn.executemany(f"DELETE FROM {table} WHERE {where}", list(keys))
+            placeholders = ", ".join("?" for _ in cols)
+            col_names = ", ".join(_quote(c) for c in cols)
+            conn.executemany(f"INSERT INTO {table} ({col_names}) VALUES ({placeholders})", records)
+    finally:
+        conn.close()
+    return len(records), skipped
+
+def run_query(sql, params=(), path=None, read_only=False):
+    """
+    SQLを実行し、結果をDataFrameで返します。
+    """
+    conn = connect(path, read_only=read_only)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+# 自由入力のSQLで許可する操作（読み取りのみ。ATTACH・書き込み・PRAGMAなどは拒否）
+_USER_QUERY_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+def _authorize_user_query(action, arg1, arg2, db_name, trigger):
+    """
+    自由入力のSQLで、読み取り以外の操作を拒否します。
+    """
+    return sqlite3.SQLITE_OK if action in _USER_QUERY_ACTIONS else sqlite3.SQLITE_DENY
+
+def run_user_query(sql, path=None):
+    """
+    画面やコマンドラインから入力されたSQLを読み取り専用で実行し、結果をDataFrameで返します。
+    SELECT（WITH を含む）以外の文や、ATTACH・書き込みを含む文は ValueError になります。
+    """
+    path = path or DB_PATH
+    if not os.path.exists(path):
+        raise ValueError(f"履歴DBがまだありません（{path}）。各分析ページで「履歴DBに保存」を実行してください。")
+
+    conn = connect(path, read_only=True)
+    try:
+        conn.set_authorizer(_authorize_user_query)
+        try:
+            cur = conn.execute(sql)
+        except sqlite3.DatabaseError as e:
+            if "not authorized" in str(e):
+                raise ValueError("実行できるのは SELECT 文（WITH を含む）だけです。") from e
+            raise
+        if cur.description is None:
+            raise ValueError("結果を返さないSQLです。SELECT 文を入力してください。")
+        columns = [d[0] for d in cur.description]
+        return pd.DataFrame(cur.fetchall(), columns=columns)
+    finally:
+        conn.close()
+
+def table_counts(path=None):
+    """
+    各テーブルの保存件数と最終取込日時を返します。
+    """
+    sql = " UNION ALL ".join(
+        f"SELECT '{table}' AS テーブル, COUNT(*) AS 件数, MAX(取込日時) AS 最終取込日時 FROM {table}"
+        for table in TABLES
+    )
+    return run_query(sql, path=path)
+
+# ---------------------------- 定型の集計 ----------------------------
+
+def consecutive_growth(table, years=3, path=None):
+    """
+    直近 years 年のあいだ、毎年前年より値が伸びた集計単位（大分類・分類）を返します。
+    年が飛んでいる場合（前年のデータがない場合）は伸びたとみなしません。
+    月別に保存しているテーブル（item_sales）は月を年ごとに合計し、直近年に存在する月だけで比較します。
+    wholesale_sales は期間を持たないため、各年度が通年のデータで保存されている前提です
+    （年度途中までのデータを保存すると、直近年度が少なく集計されます）。
+    """
+    if table not in GROWTH_SOURCES:
+        raise ValueError(f"連続成長を集計できないテーブルです: {table}")
+    group_col, year_col, month_col, value_col = GROWTH_SOURCES[table]
+    group_col, year_col, value_col = _quote(group_col), _quote(year_col), _quote(value_col)
+    month_expr = _quote(month_col) if month_col else "NULL"
+    month_filter = "WHERE 月 IN (SELECT 月 FROM months)" if month_col else ""
+
+    sql = f"""
+        WITH base AS (
+            SELECT {group_col} AS 集計単位, {year_col} AS 年, {month_expr} AS 月, {value_col} AS 値
+            FROM {table}
+            WHERE {group_col} IS NOT NULL AND {year_col} IS NOT NULL
+        ),
+        months AS (
+            SELECT DISTINCT 月 FROM base WHERE 年 = (SELECT MAX(年) FROM base)
+        ),
+        yearly AS (
+            SELECT 集計単位, 年, SUM(値) AS 値
+            FROM base
+            {month_filter}
+            GROUP BY 1, 2
+        ),
+        diffs AS (
+            SELECT 集計単位, 年, 値,
+                   LAG(年) OVER w AS 前年,
+                   LAG(値) OVER w AS 前年値
+            FROM yearly
+            WINDOW w AS (PARTITION BY 集計単位 ORDER BY 年)
+        )
+        SELECT 集計単位 AS {group_col},
+               MAX(CASE WHEN 年 = 最新年 - ? + 1 THEN 前年値 END) AS 起点値,
+               MAX(CASE WHEN 年 = 最新年 THEN 値 END) AS 直近値
+        FROM diffs, (SELECT MAX(年) AS 最新年 FROM yearly)
+        WHERE 年 > 最新年 - ?
+        GROUP BY 集計単位
+        HAVING SUM(CASE WHEN 前年 = 年 - 1 AND 値 > 前年値 THEN 1 ELSE 0 END) = ?
+        ORDER BY 直近値 DESC
+    """
+    return run_query(sql, params=(years, years, years), path=path)
+
+def adoption_rate_by_person_quarter(path=None):
+    """
+    担当者別・四半期別の採用率（採用件数 ÷ 商品件数）を返します。
+    """
+    sql = """
+        SELECT 担当者,
+               strftime('%Y', 記入日) || '-Q' || ((CAST(strftime('%m', 記入日) AS INTEGER) + 2) / 3) AS 四半期,
+               COUNT(商品名) AS 商品件数,
+               SUM(CASE WHEN 結果 = '採用' THEN 1 ELSE 0 END) AS 採用件数,
+               ROUND(SUM(CASE WHEN 結果 = '採用' THEN 1 ELSE 0 END) * 100.0 / COUNT(商品名), 1) AS "採用率(%)"
+        FROM visits
+        WHERE 記入日 IS NOT NULL AND 担当者 != '不明'
+        GROUP BY 1, 2
+        HAVING COUNT(商品名) > 0
+        ORDER BY 1, 2
+    """
+    return run_query(sql, path=path)
+
+# ---------------------------- コマンドライン ----------------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(table_counts().to_string(index=False))
+    else:
+        try:
+            print(run_user_query(sys.argv[1]).to_string(index=False))
+        except (ValueError, sqlite3.Error) as e:
+            print(f"エラー：{e}", file=sys.stderr)
+            sys.exit(1)
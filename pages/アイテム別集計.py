@@ -1,6 +1,7 @@
 import pandas as pd
 import streamlit as st
 import re
+import history_store
 
 st.set_page_config(page_title="商品分類別売上集計", layout="wide")
 st.title("📊 アイテム別集計システム")
@@ -59,9 +60,10 @@ if class_file and data_file:
         # --- ⑤ 年・個数・金額ペア抽出 ---
         records = []
         for col in df_data.columns:
-            match = re.match(r'(\d{4})年\d+月_個数', col)
+            match = re.match(r'(\d{4})年(\d+)月_個数', col)
             if match:
                 year = int(match.group(1))
+                month = int(match.group(2))
                 amt_col = col.replace('個数', '金額')
                 if amt_col in df_data.columns:
                     temp = df_data[['分類', col, amt_col]].copy()
@@ -69,6 +71,7 @@ if class_file and data_file:
                     temp['個数'] = pd.to_numeric(temp['個数'], errors='coerce').fillna(0)
                     temp['金額'] = pd.to_numeric(temp['金額'], errors='coerce').fillna(0)
                     temp['年'] = year
+                    temp['月'] = month
                     records.append(temp)
 
         if not records:
@@ -76,8 +79,9 @@ if class_file and data_file:
             st.stop()
 
         # --- ⑥ 集計と前年比 ---
-        df_all = pd.concat(records)
-        df_all = df_all.dropna(subset=['分類']).groupby(['分類', '年']).sum(numeric_only=True).reset_index()
+        # 月別の集計（履歴DBへの保存用）と年別の集計
+        df_monthly = pd.concat(records).dropna(subset=['分類']).groupby(['分類', '年', '月']).sum(numeric_only=True).reset_index()
+        df_all = df_monthly.drop(columns=['月']).groupby(['分類', '年']).sum(numeric_only=True).reset_index()
 
         if df_all.empty:
             st.info("集計するデータがありません。")
@@ -125,6 +129,18 @@ if class_file and data_file:
         else:
             st.info("集計結果が生成されませんでした。データを確認してください。")
 
+        # --- ⑪ 履歴DBへの保存（任意） ---
+        st.header("④ 履歴DBに保存（任意）")
+        st.caption("保存しておくと「履歴分析」ページで複数回のアップロードをまたいだ集計ができます。同じ年月のデータは上書きされます。")
+        if st.button("📥 分類・年月別の集計を履歴DBに保存", key="save_history_button"):
+            try:
+                saved, skipped = history_store.save_frame("item_sales", df_monthly)
+                st.success(f"✅ 履歴DBに {saved} 件保存しました。")
+                if skipped:
+                    st.warning(f"キー（年・月）が空欄の {skipped} 件は保存しませんでした。")
+            except Exception as e:
+                st.error(f"履歴DBへの保存に失敗しました：{e}")
+
     except Exception as e:
         st.error(f"⚠️ エラーが発生しました：\n\n{e}")
 else:
@@ -1,5 +1,7 @@
 import streamlit as st
 import pandas as pd
+from datetime import datetime
+import history_store
 
 # ---------------------------- ヘルパー関数 ----------------------------
 
@@ -242,6 +244,22 @@ if prev_file and curr_file and helper_file:
         else:
             st.info("集計するデータがありません。")
 
+    st.markdown("### Step 4: 履歴DBに保存（任意）")
+    st.caption("保存しておくと「履歴分析」ページで複数年をまたいだ集計ができます。同じ年度のデータは上書きされます。"
+               "年度単位で比較するため、前年・今年とも通年のデータを保存してください（年度途中のデータは比較が正しくなりません）。")
+    curr_year = st.number_input("今年データの年度", min_value=2000, max_value=2100, value=datetime.now().year, step=1, key="curr_year_input")
+    if st.button("📥 整理後データを履歴DBに保存", key="save_history_button"):
+        try:
+            # 前年・今年を1回の保存（1つのトランザクション）で書き込む
+            both_years = pd.concat([
+                prev_clean.assign(年度=int(curr_year) - 1),
+                curr_clean.assign(年度=int(curr_year)),
+            ], ignore_index=True)
+            saved, _ = history_store.save_frame("wholesale_sales", both_years)
+            st.success(f"履歴DBに {saved} 件保存しました（{int(curr_year) - 1}年度・{int(curr_year)}年度）。")
+        except Exception as e:
+            st.error(f"履歴DBへの保存に失敗しました：{e}")
+
     st.success("分析完了！")
 else:
     st.info("前年・今年・補助データの3ファイルをすべてアップロードしてください。")
@@ -5,6 +5,7 @@ import re
 from collections import Counter
 from datetime import datetime
 import openpyxl # openpyxlをインポート
+import history_store
 
 # 定数
 KINIKI_AREAS = ["大阪", "奈良", "京都", "滋賀", "兵庫", "三重", "和歌山"]
@@ -75,6 +76,21 @@ if uploaded_file:
         df["カテゴリ"] = df["採用・不採用理由"].apply(
             lambda x: re.findall(r"【(.*?)】", str(x))[0].split("・") if re.findall(r"【(.*?)】", str(x)) else [])
 
+        # 履歴DBへの保存（任意）
+        st.sidebar.markdown("### 📥 履歴DBに保存")
+        st.sidebar.caption("保存しておくと「履歴分析」ページで四半期をまたいだ集計ができます。同じUUIDのデータは上書きされます。")
+        if st.sidebar.button("訪問データ・操作履歴を保存", key="save_history_button"):
+            try:
+                saved_visits, skipped_visits = history_store.save_frame("visits", df)
+                saved_logs, skipped_logs = history_store.save_frame("operation_logs", df_log)
+                st.sidebar.success(f"訪問データ {saved_visits} 件、操作履歴 {saved_logs} 件を保存しました。")
+                if skipped_visits:
+                    st.sidebar.warning(f"UUIDが空欄の訪問データ {skipped_visits} 件は保存しませんでした。")
+                if skipped_logs:
+                    st.sidebar.warning(f"日時・対象UUID・操作タイプのいずれかが空欄の操作履歴 {skipped_logs} 件は保存しませんでした。")
+            except Exception as e:
+                st.sidebar.error(f"履歴DBへの保存に失敗しました：{e}")
+
         # Streamlitのセッションステートに変数を初期化
         if 'df_filtered_display' not in st.session_state:
             st.session_state.df_filtered_display = None
@@ -0,0 +1,69 @@
+# 履歴分析.py
+import streamlit as st
+import history_store
+
+# ページ設定
+st.set_page_config(page_title="履歴分析", layout="wide")
+st.title("🗂️ 履歴分析")
+st.write("各ページで「履歴DBに保存」したデータを、アップロードをまたいで集計します。")
+
+try:
+    # 保存状況の表示
+    st.markdown("### 保存状況")
+    counts = history_store.table_counts()
+    st.dataframe(counts, use_container_width=True)
+
+    if counts["件数"].sum() == 0:
+        st.info("履歴DBにデータがありません。各分析ページで「履歴DBに保存」を実行してください。")
+        st.stop()
+
+    # 連続して伸びた大分類・分類
+    st.markdown("### 連続成長")
+    col1, col2 = st.columns(2)
+    with col1:
+        source = st.selectbox(
+            "集計対象",
+            ("wholesale_sales", "item_sales"),
+            format_func=lambda t: {"wholesale_sales": "卸営業（大分類・純売上額）", "item_sales": "アイテム別（分類・金額）"}[t],
+            key="growth_source_select"
+        )
+    with col2:
+        years = st.number_input("連続年数", min_value=1, max_value=20, value=3, step=1, key="growth_years_input")
+    if source == "wholesale_sales":
+        st.caption("卸営業は年度ごとの通年データで比較します。年度途中のデータを保存している年度は正しく比較できません。")
+    else:
+        st.caption("アイテム別は直近年に含まれる月だけで各年を比較します。")
+    growth_df = history_store.consecutive_growth(source, int(years))
+    if not growth_df.empty:
+        st.dataframe(growth_df, use_container_width=True)
+    else:
+        st.write("該当するデータがありません。")
+
+    # 担当者別・四半期別の採用率
+    st.markdown("### 担当者別・四半期別の採用率")
+    rate_df = history_store.adoption_rate_by_person_quarter()
+    if not rate_df.empty:
+        st.dataframe(rate_df, use_container_width=True)
+        pivot = rate_df.pivot(index="四半期", columns="担当者", values="採用率(%)")
+        st.line_chart(pivot)
+    else:
+        st.write("該当するデータがありません。")
+
+    # 自由入力のSQL（読み取り専用）
+    st.markdown("### SQLで集計")
+    st.caption("テーブル：" + "、".join(history_store.TABLES) + "（SELECT 文のみ、読み取り専用で実行します）")
+    sql = st.text_area("SQL", "SELECT * FROM wholesale_sales LIMIT 100", key="free_sql_input")
+    if st.button("▶ 実行", key="run_sql_button"):
+        try:
+            st.dataframe(history_store.run_user_query(sql), use_container_width=True)
+        except ValueError as e:
+            st.warning(str(e))
+        except Exception as e:
+            st.error(f"SQLの実行に失敗しました：{e}")
+
+except Exception as e:
+    st.error(f"エラーが発生しました：{e}")
+
+# ホーム画面に戻るリンクを一番下に追加
+st.markdown("---")
+st.page_link("分析ツールまとめ.py", label="メインメニューに戻る🏠", icon="🏠")
@@ -0,0 +1,196 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import history_store
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "history.db")
+
+
+def count(db, table):
+    return history_store.run_query(f"SELECT COUNT(*) AS n FROM {table}", path=db)["n"][0]
+
+
+def wholesale(year, sales):
+    return pd.DataFrame({
+        "年度": year,
+        "得意先コード": [f"{i:04d}" for i in range(len(sales))],
+        "得意先名": [f"得意先{i}" for i in range(len(sales))],
+        "大分類": list(sales),
+        "純売上額": list(sales.values()),
+        "構成比": 0.0,
+    })
+
+
+# ---------------------------- 保存 ----------------------------
+
+def test_save_frame_replaces_rows_with_same_key(db):
+    df = wholesale(2023, {"駅": 100, "空港": 200})
+    assert history_store.save_frame("wholesale_sales", df, path=db) == (2, 0)
+    assert history_store.save_frame("wholesale_sales", df, path=db) == (2, 0)
+    assert count(db, "wholesale_sales") == 2
+
+    history_store.save_frame("wholesale_sales", wholesale(2024, {"駅": 150}), path=db)
+    assert count(db, "wholesale_sales") == 3
+
+
+def test_save_frame_skips_rows_with_empty_key(db):
+    visits = pd.DataFrame({"UUID": ["a", None, "b"], "担当者": ["田中", "田中", "鈴木"]})
+    assert history_store.save_frame("visits", visits, path=db) == (2, 1)
+    assert history_store.save_frame("visits", visits, path=db) == (2, 1)
+    assert count(db, "visits") == 2
+
+    logs = pd.DataFrame({
+        "日時": pd.to_datetime(["2024-01-01 10:00", "不正な日付"], errors="coerce"),
+        "対象UUID": ["a", "b"],
+        "操作タイプ": ["編集", "編集"],
+    })
+    history_store.save_frame("operation_logs", logs, path=db)
+    history_store.save_frame("operation_logs", logs, path=db)
+    assert count(db, "operation_logs") == 1
+
+
+def test_save_frame_without_key_column_saves_nothing(db):
+    visits = pd.DataFrame({"担当者": ["田中", "鈴木"]})
+    assert history_store.save_frame("visits", visits, path=db) == (0, 2)
+    assert count(db, "visits") == 0
+
+
+def test_save_frame_converts_lists_and_datetimes(db):
+    visits = pd.DataFrame({
+        "UUID": ["a"],
+        "記入日": pd.to_datetime(["2024-05-01 09:30"]),
+        "カテゴリ": [["価格", "品質"]],
+    })
+    history_store.save_frame("visits", visits, path=db)
+    row = history_store.run_query("SELECT 記入日, カテゴリ FROM visits", path=db).iloc[0]
+    assert row["記入日"] == "2024-05-01 09:30:00"
+    assert row["カテゴリ"] == "価格・品質"
+
+
+def test_save_frame_rejects_unknown_table(db):
+    with pytest.raises(ValueError):
+        history_store.save_frame("unknown", pd.DataFrame({"a": [1]}), path=db)
+
+
+def test_item_sales_keeps_months_outside_the_new_upload(db):
+    # 2023年4月〜2024年3月の年度ファイルの後に、2024年4月〜2025年3月の年度ファイルを保存
+    first = pd.DataFrame({"分類": "菓子", "年": [2023] * 9 + [2024] * 3, "月": list(range(4, 13)) + [1, 2, 3], "個数": 1, "金額": 10})
+    second = pd.DataFrame({"分類": "菓子", "年": [2024] * 9 + [2025] * 3, "月": list(range(4, 13)) + [1, 2, 3], "個数": 1, "金額": 10})
+    history_store.save_frame("item_sales", first, path=db)
+    history_store.save_frame("item_sales", second, path=db)
+    months_2024 = history_store.run_query("SELECT 月 FROM item_sales WHERE 年 = 2024 ORDER BY 月", path=db)["月"]
+    assert months_2024.tolist() == list(range(1, 13))
+
+
+def test_connect_adds_columns_missing_from_existing_db(db):
+    conn = sqlite3.connect(db)
+    conn.execute('CREATE TABLE item_sales ("分類" TEXT, "年" INTEGER, "個数" REAL, "金額" REAL, 取込日時 TEXT)')
+    conn.close()
+    history_store.connect(db).close()
+    conn = sqlite3.connect(db)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(item_sales)")}
+    conn.close()
+    assert "月" in columns
+
+
+# ---------------------------- 定型の集計 ----------------------------
+
+def test_consecutive_growth_needs_one_more_year_than_the_streak(db):
+    for year, sales in [(2021, 100), (2022, 110), (2023, 120), (2024, 130)]:
+        history_store.save_frame("wholesale_sales", wholesale(year, {"駅": sales}), path=db)
+    result = history_store.consecutive_growth("wholesale_sales", 3, path=db)
+    assert result["大分類"].tolist() == ["駅"]
+    assert result["起点値"][0] == 100
+    assert result["直近値"][0] == 130
+    assert history_store.consecutive_growth("wholesale_sales", 4, path=db).empty
+
+
+def test_consecutive_growth_breaks_on_decline_and_gap(db):
+    data = {
+        2021: {"駅": 100, "空港": 100},
+        2022: {"駅": 90, "空港": 110},
+        2024: {"駅": 120, "空港": 130},
+    }
+    for year, sales in data.items():
+        history_store.save_frame("wholesale_sales", wholesale(year, sales), path=db)
+    # 2023年がないため、2024年は伸びたとみなさない
+    assert history_store.consecutive_growth("wholesale_sales", 1, path=db).empty
+    history_store.save_frame("wholesale_sales", wholesale(2023, {"駅": 95, "空港": 120}), path=db)
+    assert history_store.consecutive_growth("wholesale_sales", 3, path=db)["大分類"].tolist() == ["空港"]
+    assert set(history_store.consecutive_growth("wholesale_sales", 2, path=db)["大分類"]) == {"駅", "空港"}
+
+
+def test_consecutive_growth_compares_only_months_present_in_latest_year(db):
+    # 2023年は通年、2024年は1〜3月のみ。同じ月どうしでは伸びている
+    full_year = pd.DataFrame({"分類": "菓子", "年": 2023, "月": range(1, 13), "個数": 1, "金額": 10})
+    partial = pd.DataFrame({"分類": "菓子", "年": 2024, "月": [1, 2, 3], "個数": 1, "金額": 20})
+    history_store.save_frame("item_sales", full_year, path=db)
+    history_store.save_frame("item_sales", partial, path=db)
+    result = history_store.consecutive_growth("item_sales", 1, path=db)
+    assert result["分類"].tolist() == ["菓子"]
+    assert result["起点値"][0] == 30
+    assert result["直近値"][0] == 60
+
+
+def test_adoption_rate_by_person_quarter(db):
+    visits = pd.DataFrame({
+        "UUID": ["a", "a", "b", "c"],
+        "担当者": ["田中", "田中", "田中", "不明"],
+        "記入日": pd.to_datetime(["2024-05-01", "2024-05-01", "2024-11-01", "2024-05-01"]),
+        "商品名": ["x", "y", "z", "w"],
+        "結果": ["採用", "不採用", "採用", "採用"],
+    })
+    history_store.save_frame("visits", visits, path=db)
+    result = history_store.adoption_rate_by_person_quarter(path=db)
+    assert result["四半期"].tolist() == ["2024-Q2", "2024-Q4"]
+    assert result["採用率(%)"].tolist() == [50.0, 100.0]
+
+
+def test_read_only_connect_handles_special_characters_in_path(tmp_path):
+    db = str(tmp_path / "x#y?z%20.db")
+    history_store.save_frame("wholesale_sales", wholesale(2024, {"駅": 100}), path=db)
+    assert count(db, "wholesale_sales") == 1
+
+    conn = history_store.connect(db, read_only=True)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM wholesale_sales").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("CREATE TABLE t (a)")
+    finally:
+        conn.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["x#y?z%20.db"]
+
+
+def test_run_user_query_returns_select_results(db):
+    history_store.save_frame("wholesale_sales", wholesale(2024, {"駅": 100}), path=db)
+    result = history_store.run_user_query("WITH t AS (SELECT 大分類 FROM wholesale_sales) SELECT * FROM t", path=db)
+    assert result["大分類"].tolist() == ["駅"]
+
+
+@pytest.mark.parametrize("sql", [
+    "CREATE TABLE t (a)",
+    "DELETE FROM wholesale_sales",
+    "PRAGMA table_info(wholesale_sales)",
+])
+def test_run_user_query_rejects_non_select(db, sql):
+    history_store.connect(db).close()
+    with pytest.raises(ValueError):
+        history_store.run_user_query(sql, path=db)
+
+
+def test_run_user_query_rejects_attach(db, tmp_path):
+    history_store.connect(db).close()
+    other = tmp_path / "other.db"
+    with pytest.raises(ValueError):
+        history_store.run_user_query(f"ATTACH DATABASE '{other}' AS other", path=db)
+    assert not other.exists()
+
+
+def test_run_user_query_without_db(db):
+    with pytest.raises(ValueError, match="履歴DBがまだありません"):
+        history_store.run_user_query("SELECT 1", path=db)
@@ -15,6 +15,7 @@ st.markdown("---")  # 区切り線
 st.page_link("pages/営業報告分析.py", label="営業報告分析📊", icon="📊")
 st.page_link("pages/卸営業数値分析.py", label="卸営業数値分析📈", icon="📈")
 st.page_link("pages/アイテム別集計.py", label="アイテム別集計📦", icon="📦")
+st.page_link("pages/履歴分析.py", label="履歴分析🗂️", icon="🗂️")
 
 st.markdown("---")
 st.info("💡 各リンクをクリックすると、それぞれの分析ページに移動します。")
\ No newline at end of file